@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2019 Würth Phoenix S.r.l.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""Numba compiled numeric functions for rlog_generator.
+
+If numba is installed, these functions replace the Faker based ones with
+the same name. Otherwise FUNCTIONS is empty and nothing changes.
+"""
+
+
+import logging
+import random
+import time
+
+from . import utils
+
+log = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # pragma: no cover
+    njit = None
+    log.debug("numba not found, numeric functions use Faker")
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _randint_nb(min_value, max_value):
+        return np.random.randint(min_value, max_value + 1)
+
+    @njit(cache=True)
+    def _timestamp_nb(now, period):
+        return now - np.random.randint(0, period + 1)
+
+    @njit(cache=True)
+    def _seed_nb(value):
+        np.random.seed(value)
+
+    # compile now, not on first log. Seeding from system entropy keeps
+    # unseeded runs random
+    _randint_nb(0, 1)
+    _timestamp_nb(0, 1)
+    _seed_nb(random.SystemRandom().getrandbits(32))
+
+
+def seed(value):
+    """Seed the numba random generator of current thread.
+
+    Arguments:
+        value {int} -- seed
+    """
+    if njit is not None:
+        _seed_nb(value)
+
+
+def rand_int(fake, min_value, max_value):
+    """Return random integer in range [min_value, max_value],
+    including both end points
+
+    Arguments:
+        fake {Faker} -- unused, kept for the provider signature
+        min_value {int} -- min value
+        max_value {int} -- max value
+
+    Returns:
+        int -- random integer in range [min_value, max_value]
+    """
+    return _randint_nb(int(min_value), int(max_value))
+
+
+def timestamp(fake):
+    """Return epoch timestamp, random seconds in the last 30 days
+
+    Arguments:
+        fake {Faker} -- unused, kept for the provider signature
+
+    Returns:
+        int -- epoch timestamp
+    """
+    return _timestamp_nb(int(time.time()), utils.TIMESTAMP_PERIOD)
+
+
+FUNCTIONS = {
+    "rand_int": rand_int,
+    "timestamp": timestamp,
+} if njit is not None else {}
@@ -19,9 +19,11 @@ limitations under the License.
 """Main module."""
 
 
+import contextlib
 import glob
 import logging
 import os
+import sys
 import time
 from elasticsearch import Elasticsearch
 import yaml
@@ -36,6 +38,7 @@ from . import utils
 TEMPLATE = "template"
 RAW = "raw"
 MAX_CONCUR_REQ = 100
+FILE_BUFFERING = 1 << 20
 
 
 log = logging.getLogger(__name__)
@@ -92,9 +95,7 @@ def log_generator(pattern_conf):
     log.debug(f"EPS corrected: {eps}")
     nr_logs = eps * time_period
     log.debug(f"[{name}] - Total logs to generate is {nr_logs}")
-    sleep_time = 1 / eps
-
-    log.debug(f"[{name}] - Ideal sleep time between logs is {sleep_time}")
+    log.debug(f"[{name}] - Writing {eps} logs each second")
 
     progress_bar = pattern_conf.get("progress_bar", False)
     # Set locale for Faker based on the configuration
@@ -137,51 +138,50 @@ def log_generator(pattern_conf):
 
     if progress_bar:  # pragma: no cover
         range_func = trange
-        range_kvargs = {"desc": f"{name} logs loop"}
+        range_kvargs = {"desc": f"{name} seconds loop"}
     else:
         range_func = range
         range_kvargs = {}
 
     if generator_type == TEMPLATE:
         log.debug(f"[{name}] - Generating logs from template")
-        fields = pattern_conf["fields"]
+        plan = utils.compile_fields(pattern_conf["fields"], fake)
 
         if not isinstance(pattern_conf["template"], list):
             raise ValueError("template must be a list of templates")
 
-        # Initial conditions to fix sleep time
-        wait = 0
-        elapsed_end = 0
-
-        for i in range_func(nr_logs, **range_kvargs):
-            start = time.time()
-            template = utils.faker_random_value(fake, pattern_conf["template"])
-            log_str = utils.get_template_log(template, fields, fake)
-
-            if stdout:
-                print(log_str)  # Output to stdout
-
-            if elastic_output:
-                try:
-                    es.index(index=elastic_config["elastic_index"], pipeline=elastic_config["elastic_pipeline"], body={"message": log_str})
-                except Exception as e:
-                    log.error(f"Error sending data to Elasticsearch: {e}")
-
-            if log_output:
-                with open(path, "a") as f:
-                    log_str = utils.get_template_log(template, fields, fake)
-                    f.write(log_str + "\n")
-
-                elapsed_first = time.time() - start
-
-                start = time.time()
-                wait = sleep_time - elapsed_first - elapsed_end
-                try:
-                    time.sleep(wait)
-                except ValueError:
-                    pass
-                finally:
-                    elapsed_end = time.time() - start - wait
+        logs = [utils.compile_log(i, plan) for i in pattern_conf["template"]]
+        rng = utils.faker_rng(fake)
+
+        if log_output:
+            out = open(path, "a", buffering=FILE_BUFFERING)
+        else:
+            out = contextlib.nullcontext()
+
+        # a batch of eps logs each second, with a single write per output
+        with out:
+            deadline = time.time()
+
+            for _ in range_func(time_period, **range_kvargs):
+                batch = utils.generate_many(logs, eps, rng)
+
+                if stdout:
+                    utils.write_logs(sys.stdout, batch)  # Output to stdout
+
+                if elastic_output:
+                    for log_str in batch:
+                        try:
+                            es.index(index=elastic_config["elastic_index"], pipeline=elastic_config["elastic_pipeline"], body={"message": log_str[:-1]})
+                        except Exception as e:
+                            log.error(f"Error sending data to Elasticsearch: {e}")
+
+                if log_output:
+                    utils.write_logs(out, batch)
+
+                    deadline += 1
+                    wait = deadline - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
 
     elif generator_type == RAW:
         raise NotImplementedError("Generator type 'raw' is not implemented")
@@ -19,23 +19,69 @@ limitations under the License.
 """Utils module for rlog_generator."""
 
 
+import collections
 import datetime
+import functools
+import inspect
 import logging
 import sys
+import threading
+import time
 import yaml
 import os
 import importlib
+import importlib.util
+import re
+import string
 
 from faker import Faker
 
+from . import fast_numeric
+
 log = logging.getLogger(__name__)
 
+# random seconds of timestamp function: last 30 days
+TIMESTAMP_PERIOD = 2592000
+
+# function name: function, see _get_function_table
+_FUNC_TABLE = None
+
+# provider modules, loaded once by load_provider_modules
+_PROVIDER_MODULES = None
+
+# provider function name: provider module
+_PROVIDER_INDEX = {}
+
+# Faker instances of each thread, see faker_localization
+_FAKERS = threading.local()
+
+# attribute of Faker instance with its dispatch table
+_DISPATCH_ATTR = "_rlog_dispatch_table"
+
+# (epoch second, datetime) of the last timestamp used in logs
+_NOW_CACHE = (None, None)
+
+# libyaml-backed loader when available, pure Python safe loader otherwise
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# True once the YAML loader is logged, see load_config
+_YAML_LOGGED = False
+
 def load_config(yaml_file, seed):
     """Return a Python object given a YAML file."""
+    global _YAML_LOGGED
+
+    # here and not at import time, when logging is not configured yet
+    if not _YAML_LOGGED:
+        _YAML_LOGGED = True
+        if _YAML_LOADER is yaml.SafeLoader:
+            log.debug("PyYAML without libyaml, pattern files are parsed "
+                      "by the pure Python loader")
+
     try:
-        with open(yaml_file, 'r') as f:
+        with open(yaml_file, 'rb') as f:
             log.debug(f"Loading file {yaml_file}")
-            config = yaml.load(f, Loader=yaml.FullLoader)
+            config = yaml.load(f, Loader=_YAML_LOADER)
             config["seed"] = seed
             return config
     except FileNotFoundError:
@@ -46,60 +92,146 @@ def load_config(yaml_file, seed):
         return None
 
 def load_provider_modules():
+    """Return all provider modules, loaded from their files without
+    changing sys.path. Modules are loaded only once and cached.
+    It also fills _PROVIDER_INDEX, the module of each provider function.
+
+    Returns:
+        dict -- module name: module object
+    """
+    global _PROVIDER_MODULES
+
+    if _PROVIDER_MODULES is not None:
+        return _PROVIDER_MODULES
+
     provider_modules = {}
     providers_dir = os.path.join(os.path.dirname(__file__), 'providers')
-    sys.path.insert(0, providers_dir)
 
-    for filename in os.listdir(providers_dir):
-        if filename.endswith('.py') and filename != '__init__.py':
-            module_name = filename[:-3]
-            module = importlib.import_module(module_name)
+    # sorted, so the first module found doesn't depend on file system
+    for entry in sorted(os.scandir(providers_dir), key=lambda e: e.name):
+        if entry.name.endswith('.py') and entry.name != '__init__.py':
+            module_name = entry.name[:-3]
+            spec = importlib.util.spec_from_file_location(
+                module_name, entry.path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
             provider_modules[module_name] = module
 
+            # first module found wins
+            for attr, obj in vars(module).items():
+                if callable(obj) and not attr.startswith('_'):
+                    _PROVIDER_INDEX.setdefault(attr, module)
+
+    _PROVIDER_MODULES = provider_modules
     return provider_modules
 
+
 provider_functions = load_provider_modules()
 
-def timestamp():
+
+def _get_function_table():
+    """Return a flat dict with all the functions usable in patterns.
+    The functions of this module win over the providers ones, as first
+    found wins among providers. Numba compiled functions win over all.
+    The dict is built on first use, when this module and fast_numeric
+    are both loaded.
+
+    Returns:
+        dict -- function name: function
+    """
+    global _FUNC_TABLE
+
+    if _FUNC_TABLE is not None:
+        return _FUNC_TABLE
+
+    table = {name: getattr(module, name)
+             for name, module in _PROVIDER_INDEX.items()}
+
+    for name, obj in vars(sys.modules[__name__]).items():
+        if inspect.isfunction(obj) and not name.startswith("_"):
+            table[name] = obj
+
+    # numba compiled functions, when available
+    table.update(fast_numeric.FUNCTIONS)
+
+    _FUNC_TABLE = table
+    return table
+
+
+def timestamp(fake):
     """Return epoch timestamp
 
+    Arguments:
+        fake {Faker} -- Faker instance used for random seconds
+
     Returns:
-        str -- epoch timestamp
+        int -- epoch timestamp
     """
 # TODO defaults to random seconds in the last 30 days. Allow parameter change for more flexibility
-    return round(fake.unix_time(start_datetime=datetime.timedelta(-30)))
+    return int(time.time()) - faker_rng(fake).randint(0, TIMESTAMP_PERIOD)
 
 
-def get_function(function_str, fake, module=sys.modules[__name__]):
+def get_dispatch_table(fake):
+    """Return the dispatch table of all functions usable in patterns,
+    with the Faker instance already bound.
+    The table is built only once for each Faker instance and it is stored
+    on the instance itself, so they are released together.
+
+    Arguments:
+        fake {Faker} -- Faker instance bound to the functions
+
+    Returns:
+        dict -- function name: function
+    """
+    try:
+        return vars(fake)[_DISPATCH_ATTR]
+    except KeyError:
+        table = {name: functools.partial(function, fake)
+                 for name, function in _get_function_table().items()}
+        setattr(fake, _DISPATCH_ATTR, table)
+        return table
+
+
+def get_function(function_str, fake):
     """Return the function from its string name as func_name
     Example: with the name 'func_randint'
     you will get the function name 'randint'
 
     Arguments:
         function_str {str} -- name of function preceded by 'func_'
+        fake {Faker} -- Faker instance bound to the function
 
-    Keyword Arguments:
-        module {module obj} -- module object with the function
-                                (default: {sys.modules[__name__]})
+    Raises:
+        ValueError: raised when function is not found
 
     Returns:
-        obj function -- function of module
+        obj function -- function with the Faker instance already bound
     """
-    # function_str = function_str.split("_")[1]
     function_str = function_str[len('func_'):]
 
-    if hasattr(module, function_str):
-        def func_wrapper(*args, **kwargs):
-            return getattr(module, function_str)(fake, *args, **kwargs)
-        return func_wrapper
+    try:
+        return get_dispatch_table(fake)[function_str]
+    except KeyError:
+        raise ValueError(
+            f"Function {function_str} not found in any provider modules."
+        ) from None
 
-    for module in provider_functions.values():
-        if hasattr(module, function_str):
-            def func_wrapper(*args, **kwargs):
-                return getattr(module, function_str)(fake, *args, **kwargs)
-            return func_wrapper
 
-    raise ValueError(f"Function {function_str} not found in any provider modules.")
+def compile_function_str(function_str, fake):
+    """Return the function and its parameters of a complete string
+    function, split only once.
+    Example: a complete string 'func_randint 1 10' returns the function
+    randint and the parameters ('1', '10')
+
+    Arguments:
+        function_str {str} -- complete string function
+        fake {Faker} -- Faker instance bound to the function
+
+    Returns:
+        tuple -- (function, parameters)
+    """
+    tokens = function_str.split()
+    return get_function(tokens[0], fake), tuple(tokens[1:])
 
 
 def exec_function_str(function_str, fake):
@@ -114,12 +246,8 @@ def exec_function_str(function_str, fake):
     Returns:
         any -- value of string function
     """
-    tokens = function_str.split()
-    func = get_function(tokens[0], fake)
-    if len(tokens) == 1:
-        return func()
-    else:
-        return func(*tokens[1:])
+    func, args = compile_function_str(function_str, fake)
+    return func(*args)
 
 
 def get_random_value(field_value, fake):
@@ -142,20 +270,334 @@ def get_random_value(field_value, fake):
         raise ValueError('field value can be a string or a list')
 
 
-def get_template_log(template, fields, fake):
-    """Return a random log from template string in Python formatting string
+def current_datetime():
+    """Return the current local datetime, truncated to the second.
+    The datetime object is built only when the second changes, every
+    other call in the same second gets the cached one.
+
+    Returns:
+        datetime -- current datetime
+    """
+    global _NOW_CACHE
+    sec = time.time_ns() // 1_000_000_000
+    last_sec, last_dt = _NOW_CACHE
+
+    if sec != last_sec:
+        last_dt = datetime.datetime.fromtimestamp(sec)
+        _NOW_CACHE = (sec, last_dt)
+
+    return last_dt
+
+
+class _ChoiceBuffer:
+    """Random choice of elements, drawn in blocks with random.choices
+    and served one at a time.
+
+    Arguments:
+        elements {tuple} -- elements to choose from
+        random {Random} -- random generator, see faker_rng
+
+    Keyword Arguments:
+        refill {int} -- number of elements drawn at a time (default: {1024})
+    """
+
+    __slots__ = ("elements", "random", "refill", "_buffer")
+
+    def __init__(self, elements, random, refill=1024):
+        self.elements = elements
+        self.random = random
+        self.refill = refill
+        self._buffer = collections.deque()
+
+    def __call__(self):
+        try:
+            return self._buffer.popleft()
+        except IndexError:
+            self._buffer.extend(
+                self.random.choices(self.elements, k=self.refill))
+            return self._buffer.popleft()
+
+
+def compile_field(field_value, fake):
+    """Return the function without parameters that makes the random value
+    of field value in pattern configuration. The type of field value
+    is checked here, once, and not for each log.
+
+    Arguments:
+        field_value {str/list} -- value of field in pattern configuration
+        fake {Faker} -- Faker instance used for random values
+
+    Raises:
+        ValueError: raised when field value is not valid
+
+    Returns:
+        obj function -- function that returns a random value
+    """
+    if isinstance(field_value, str):
+        func, args = compile_function_str(field_value, fake)
+        return functools.partial(func, *args) if args else func
+    elif isinstance(field_value, list):
+        return _ChoiceBuffer(tuple(field_value), faker_rng(fake))
+    else:
+        raise ValueError('field value can be a string or a list')
+
+
+def compile_fields(fields, fake):
+    """Return the compiled plan of fields in pattern configuration.
+    Every field is resolved only once in a tuple (key, function),
+    so that a random value is just function().
+    The Faker instance must be already seeded.
+
+    Arguments:
+        fields {dict} -- dict field from pattern configuration file
+        fake {Faker} -- Faker instance used for random values
+
+    Raises:
+        ValueError: raised when field value is not valid
+
+    Returns:
+        list -- list of tuples (key, function)
+    """
+    return [(k, compile_field(v, fake)) for k, v in fields.items()]
+
+
+def _parse_template(template):
+    """Return the parts of template string as tuples
+    (literal, field_name, conversion, format_spec), where field_name is
+    "0" for the timestamp field and None after the last literal.
+
+    Arguments:
+        template {str} -- template string in Python formatting string
+
+    Raises:
+        ValueError: raised when template is not valid
+
+    Returns:
+        list -- parts of template or None if it needs str.format
+                (attributes, items or nested fields)
+    """
+    parts = []
+    needs_format = False
+    # as string.Formatter: next automatic index, False with manual numbering
+    auto_index = 0
+
+    def number(field_name):
+        nonlocal auto_index
+        first = re.split(r"[.\[]", field_name, maxsplit=1)[0]
+
+        if first == "":
+            if auto_index is False:
+                raise ValueError(
+                    "cannot switch from manual field specification to "
+                    f"automatic field numbering in template {template!r}")
+            first = str(auto_index)
+            auto_index += 1
+        elif first.isdigit():
+            if auto_index:
+                raise ValueError(
+                    "cannot switch from automatic field numbering to "
+                    f"manual field specification in template {template!r}")
+            auto_index = False
+
+        if first.isdigit() and int(first) != 0:
+            raise ValueError(
+                f"Replacement index {first} out of range "
+                f"in template {template!r}")
+
+        return first
+
+    for literal, field_name, format_spec, conversion in \
+            string.Formatter().parse(template):
+        if field_name is not None:
+            first = number(field_name)
+
+            if conversion not in (None, "r", "s", "a"):
+                raise ValueError(
+                    f"Unknown conversion specifier {conversion} "
+                    f"in template {template!r}")
+
+            if any(c in field_name for c in ".["):
+                needs_format = True
+
+            for _, nested_name, _, _ in string.Formatter().parse(format_spec):
+                if nested_name is not None:
+                    number(nested_name)
+                    needs_format = True
+
+            field_name = "0" if first.isdigit() else first
+
+        parts.append((literal, field_name, conversion, format_spec))
+
+    return None if needs_format else parts
+
+
+def _generate_render(signature, parts, field_exprs, namespace, body=()):
+    """Return a function render(signature) generated from the parts of
+    template, that returns the log formatted by a f-string.
+    All constants are passed in namespace, never in the source code.
+
+    Arguments:
+        signature {str} -- parameters of generated function
+        parts {list} -- parts of template, see _parse_template
+        field_exprs {dict} -- field name: Python expression of its value
+        namespace {dict} -- global namespace of generated function
+
+    Keyword Arguments:
+        body {iterable} -- source lines before the return (default: {()})
+
+    Returns:
+        obj function -- generated function
+    """
+    pieces = []
+
+    for i, (literal, field_name, conversion, format_spec) in enumerate(parts):
+        if literal:
+            namespace[f"_l{i}"] = literal
+            pieces.append(f"{{_l{i}}}")
+
+        if field_name is None:
+            continue
+
+        expr = "now" if field_name == "0" else field_exprs[field_name]
+
+        if conversion:
+            expr += f"!{conversion}"
+
+        if format_spec:
+            namespace[f"_s{i}"] = format_spec
+            expr += f":{{_s{i}}}"
+
+        pieces.append(f"{{{expr}}}")
+
+    lines = [f"def render({signature}):"]
+    lines.extend(f"    {line}" for line in body)
+    lines.append(f'    return f"{"".join(pieces)}"')
+    exec("\n".join(lines) + "\n", namespace)
+    return namespace["render"]
+
+
+def compile_template(template):
+    """Return the compiled template string in Python formatting string
     (https://docs.python.org/3/library/string.html#custom-string-formatting)
+    The template is parsed only once and turned in a function
+    that works like template.format(now, **values).
+    The positional field {0} (or {}) is the timestamp of log.
 
     Arguments:
         template {str} -- template string in Python formatting string
-        fields {[type]} -- dict field from pattern configuration file
+
+    Raises:
+        ValueError: raised when template is not valid
+
+    Returns:
+        obj function -- function (now, values) that returns the log
+    """
+    parts = _parse_template(template)
+
+    if parts is None:
+        def render(now, values):
+            return template.format(now, **values)
+        return render
+
+    namespace = {}
+    field_exprs = {}
+
+    for _, field_name, _, _ in parts:
+        if field_name not in (None, "0") and field_name not in field_exprs:
+            key = f"_k{len(field_exprs)}"
+            namespace[key] = field_name
+            field_exprs[field_name] = f"values[{key}]"
+
+    return _generate_render("now, values", parts, field_exprs, namespace)
+
+
+def compile_log(template, plan):
+    """Return the compiled log of template string and compiled fields.
+    Every random value is computed in a local variable and put in its
+    position of template, no dict is built for each log.
+    Only the fields in template are computed.
+
+    Arguments:
+        template {str} -- template string in Python formatting string
+        plan {list} -- compiled fields, see compile_fields
+
+    Raises:
+        ValueError: raised when template is not valid or a field of
+                    template is not in fields
+
+    Returns:
+        obj function -- function (now) that returns a random log
+    """
+    parts = _parse_template(template)
+
+    if parts is None:
+        render_template = compile_template(template)
+
+        def render(now):
+            return render_template(now, {k: fn() for k, fn in plan})
+        return render
+
+    names = {field_name for _, field_name, _, _ in parts} - {None, "0"}
+    missing = names - {k for k, _ in plan}
+
+    if missing:
+        raise ValueError(
+            f"Fields {sorted(missing)} of template {template!r} not found")
+
+    namespace = {}
+    field_exprs = {}
+    body = []
+
+    for i, (k, fn) in enumerate(plan):
+        if k in names and k not in field_exprs:
+            namespace[f"_f{i}"] = fn
+            field_exprs[k] = f"_v{i}"
+            body.append(f"_v{i} = _f{i}()")
+
+    return _generate_render("now", parts, field_exprs, namespace, body)
+
+
+def get_template_log(template, plan):
+    """Return a random log from compiled template
+
+    Arguments:
+        template {function} -- compiled template, see compile_template
+        plan {list} -- compiled fields, see compile_fields
 
     Returns:
         str -- random log generated from template
     """
-    values = {k: get_random_value(v, fake) for k, v in fields.items()}
-    now = datetime.datetime.now()
-    return template.format(now, **values)
+    values = {k: fn() for k, fn in plan}
+    return template(current_datetime(), values)
+
+
+def generate_many(logs, n, random):
+    """Return n random logs, ending with new line, all with the same
+    timestamp. For each log a compiled log is chosen at random.
+
+    Arguments:
+        logs {list} -- compiled logs, see compile_log
+        n {int} -- number of logs
+        random {Random} -- random generator, see faker_rng
+
+    Returns:
+        list -- random logs
+    """
+    now = current_datetime()
+    choice = random.choice
+    return [f"{choice(logs)(now)}\n" for _ in range(n)]
+
+
+def write_logs(stream, batch):
+    """Write a batch of logs on stream with a single writelines and
+    flush it, so readers get the whole batch at once.
+
+    Arguments:
+        stream {file} -- output stream
+        batch {list} -- logs ending with new line, see generate_many
+    """
+    stream.writelines(batch)
+    stream.flush()
 
 
 def custom_log(level="WARNING", name=None):  # pragma: no cover
@@ -177,15 +619,40 @@ def custom_log(level="WARNING", name=None):  # pragma: no cover
     return log
 
 def faker_localization(locale):
-    if locale:
-        return Faker(locale)
+    """ Returns the Faker instance of locale, the default one if locale
+    is empty. Instances are cached by locale in each thread: they are not
+    thread safe, but a thread reuses them with their dispatch tables.
+    """
+    fakers = getattr(_FAKERS, "by_locale", None)
+
+    if fakers is None:
+        fakers = _FAKERS.by_locale = {}
+
+    if isinstance(locale, dict):
+        key = tuple(locale.items())  # locales with weights
+    elif isinstance(locale, list):
+        key = tuple(locale)
     else:
-        return Faker()
+        key = locale or None
+
+    try:
+        return fakers[key]
+    except KeyError:
+        fake = fakers[key] = Faker(locale) if locale else Faker()
+        return fake
 
 def faker_seed(fake, seed):
     """ Initializes Faker with a specific seed to ensure repeatable datasets.
     """
     fake.seed_instance(seed)
+    fast_numeric.seed(seed)
+
+def faker_rng(fake):
+    """ Returns the random generator of Faker instance, in single and
+    multiple locale mode. It's replaced by faker_seed, so get it after
+    seeding.
+    """
+    return fake.factories[0].random
 
 def faker_random_value(fake, list):
     """ Picks a random element from a list.
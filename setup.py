@@ -45,6 +45,9 @@ setup(
     },
     platforms=["Linux"],
     install_requires=requirements,
+    extras_require={
+        'numba': ['numba', 'numpy'],
+    },
     long_description=long_description + '\n\n' + history,
     include_package_data=True,
     keywords=['log', 'generator', 'random'],
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Copyright 2019 Würth Phoenix S.r.l.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""Tests for `rlog_generator.fast_numeric` module."""
+
+
+import logging
+import time
+import unittest
+from unittest import mock
+
+from rlog_generator import fast_numeric, utils
+
+
+logging.getLogger().addHandler(logging.NullHandler())
+
+
+@unittest.skipIf(fast_numeric.njit is None, "numba is not installed")
+class TestFastNumeric(unittest.TestCase):
+    """Tests for `rlog_generator.fast_numeric` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.fake = utils.faker_localization(None)
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+
+    def test_function_table(self):
+        """Test numba functions replace the Faker ones."""
+        func = utils.get_function("func_rand_int", self.fake)
+        self.assertIs(func.func, fast_numeric.rand_int)
+        func = utils.get_function("func_timestamp", self.fake)
+        self.assertIs(func.func, fast_numeric.timestamp)
+
+    def test_rand_int(self):
+        """Test rand_int function."""
+        numbers = {fast_numeric.rand_int(self.fake, "1", "3")
+                   for _ in range(1000)}
+        self.assertEqual(numbers, {1, 2, 3})
+
+        for number in numbers:
+            self.assertIs(type(number), int)
+
+    def test_timestamp(self):
+        """Test timestamp function."""
+        now = int(time.time())
+        value = fast_numeric.timestamp(self.fake)
+        self.assertIs(type(value), int)
+        self.assertGreaterEqual(value, now - utils.TIMESTAMP_PERIOD)
+        self.assertLessEqual(value, int(time.time()))
+
+    def test_seed(self):
+        """Test faker_seed makes numba functions repeatable."""
+        runs = []
+
+        for _ in range(2):
+            utils.faker_seed(self.fake, 1)
+            with mock.patch("time.time", return_value=1557057600.5):
+                runs.append(
+                    [fast_numeric.rand_int(self.fake, 0, 1000000)
+                     for _ in range(10)] +
+                    [fast_numeric.timestamp(self.fake) for _ in range(10)])
+
+        self.assertEqual(runs[0], runs[1])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
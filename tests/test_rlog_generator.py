@@ -20,9 +20,13 @@ limitations under the License.
 """Tests for `rlog_generator` package."""
 
 
+import datetime
+import io
 import logging
 import os
+import tempfile
 import unittest
+from unittest import mock
 
 from click.testing import CliRunner
 
@@ -38,10 +42,13 @@ class TestRlogGenerator(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures, if any."""
         self.pattern_file = "tests/conf/patterns/apache_commons.yml"
-        self.pattern = utils.load_config(self.pattern_file)
+        self.pattern = utils.load_config(self.pattern_file, None)
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
 
     def tearDown(self):
         """Tear down test fixtures, if any."""
+        self.tmp_dir.cleanup()
 
     def test_log_generator(self):
         """Test log_generator function."""
@@ -56,22 +63,69 @@ class TestRlogGenerator(unittest.TestCase):
         self.assertEqual(nr_logs, lines)
 
         patterns_err = "tests/conf/patterns_err/apache_commons.yml"
-        pattern = utils.load_config(patterns_err)
+        pattern = utils.load_config(patterns_err, None)
 
         with self.assertRaises(ValueError):
             rlog_generator.log_generator(pattern)
 
+    def test_log_generator_batches(self):
+        """Test log_generator writes a batch of eps logs each second."""
+        pattern = utils.load_config("tests/conf/patterns/dns.yml", None)
+        path = os.path.join(self.tmp_dir.name, "dns.log")
+        pattern.update({
+            "eps": 5, "time_period": 3, "stdout": True, "path": path,
+            "template": ["{:%S} {query}"]})
+
+        clock = [1000.0]
+        waits = []
+        generate_many = utils.generate_many
+
+        def fake_generate_many(*args):
+            clock[0] += 0.3  # time to generate a batch
+            return generate_many(*args)
+
+        def fake_sleep(wait):
+            waits.append(wait)
+            clock[0] += wait + 0.1  # oversleeping
+
+        now = datetime.datetime(2019, 5, 5, 12, 0, 0)
+        timestamps = [now + datetime.timedelta(seconds=i) for i in range(3)]
+
+        with mock.patch("time.time", lambda: clock[0]), \
+                mock.patch("time.sleep", fake_sleep), \
+                mock.patch.object(utils, "generate_many", fake_generate_many), \
+                mock.patch.object(
+                    utils, "current_datetime", side_effect=timestamps), \
+                mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            nr_logs = rlog_generator.log_generator(pattern)
+
+        self.assertEqual(nr_logs, 15)
+
+        with open(path) as f:
+            lines = f.read()
+
+        # stdout and file get the same logs
+        self.assertEqual(stdout.getvalue(), lines)
+
+        # one timestamp each batch of eps logs
+        seconds = [i.split()[0] for i in lines.splitlines()]
+        self.assertEqual(seconds, ["00"] * 5 + ["01"] * 5 + ["02"] * 5)
+
+        # sleep until next second, without accumulating the oversleep
+        for wait, expected in zip(waits, [0.7, 0.6, 0.6]):
+            self.assertAlmostEqual(wait, expected)
+
     def test_core(self):
         patterns_err = "tests/conf/patterns_err"
         with self.assertRaises(ValueError):
-            rlog_generator.core(patterns_err, 2)
+            rlog_generator.core(patterns_err, 2, None)
 
         patterns_empty = "tests/conf/patterns_empty"
-        res = rlog_generator.core(patterns_empty, 2)
+        res = rlog_generator.core(patterns_empty, 2, None)
         self.assertEqual(res, 0)
 
         patterns = "tests/conf/patterns"
-        res = rlog_generator.core(patterns, 2)
+        res = rlog_generator.core(patterns, 2, None)
         self.assertEqual(res, 11)
 
     def test_command_line_interface(self):
@@ -20,8 +20,15 @@ limitations under the License.
 """Tests for `rlog_generator.utils` module."""
 
 
+import collections
+import datetime
+import io
 import logging
+import random
+import threading
+import time
 import unittest
+from unittest import mock
 
 from rlog_generator import utils
 
@@ -36,68 +43,226 @@ class TestUtils(unittest.TestCase):
         """Set up test fixtures, if any."""
         self.pattern_file = "tests/conf/patterns/apache_commons.yml"
         self.conf_file = "conf/rlog_generator.yml"
-        self.pattern = utils.load_config(self.pattern_file)
+        self.pattern = utils.load_config(self.pattern_file, None)
+        self.fake = utils.faker_localization(None)
 
     def tearDown(self):
         """Tear down test fixtures, if any."""
 
     def test_randint(self):
-        """Test randint function."""
-        number = utils.randint(1, 10)
+        """Test rand_int function."""
+        numbers = utils.provider_functions["numbers_provider"]
+        number = numbers.rand_int(self.fake, 1, 10)
         self.assertGreaterEqual(number, 1)
         self.assertLessEqual(number, 10)
 
     def test_randip(self):
-        """Test randip function."""
-        ip = utils.randip()
+        """Test rand_ipv4 function."""
+        internet = utils.provider_functions["internet_provider"]
+        ip = internet.rand_ipv4(self.fake)
         self.assertIsInstance(ip, str)
         self.assertEqual(len(ip.split(".")), 4)
 
     def test_get_function(self):
         """Test get_function function."""
-        func = utils.get_function("func_randip")
+        func = utils.get_function("func_rand_ipv4", self.fake)
         ip = func()
         self.assertIsInstance(ip, str)
         self.assertEqual(len(ip.split(".")), 4)
 
-        func = utils.get_function("func_randint")
+        func = utils.get_function("func_rand_int", self.fake)
         number = func(1, 10)
         self.assertGreaterEqual(number, 1)
         self.assertLessEqual(number, 10)
 
+        with self.assertRaises(ValueError):
+            utils.get_function("func_fake", self.fake)
+
     def test_exec_function_str(self):
         """Test exec_function_str function."""
-        ip = utils.exec_function_str("func_randip")
+        ip = utils.exec_function_str("func_rand_ipv4", self.fake)
         self.assertIsInstance(ip, str)
         self.assertEqual(len(ip.split(".")), 4)
-        number = utils.exec_function_str("func_randint 1 10")
+        number = utils.exec_function_str("func_rand_int 1 10", self.fake)
         self.assertGreaterEqual(number, 1)
         self.assertLessEqual(number, 10)
 
     def test_get_random_value(self):
         """Test get_random_value function."""
         with self.assertRaises(ValueError):
-            utils.get_random_value({'fake_key': 'fake_value'})
+            utils.get_random_value({'fake_key': 'fake_value'}, self.fake)
 
-        ip = utils.get_random_value("func_randip")
+        ip = utils.get_random_value("func_rand_ipv4", self.fake)
         self.assertIsInstance(ip, str)
         self.assertEqual(len(ip.split(".")), 4)
 
         value_list = list(range(10))
-        value = utils.get_random_value(value_list)
+        value = utils.get_random_value(value_list, self.fake)
         self.assertGreaterEqual(value, 0)
         self.assertLessEqual(value, 9)
 
+    def test_current_datetime(self):
+        """Test current_datetime function."""
+        with mock.patch("time.time_ns", return_value=1557057600_200000000):
+            now = utils.current_datetime()
+        with mock.patch("time.time_ns", return_value=1557057600_900000000):
+            self.assertIs(utils.current_datetime(), now)
+        with mock.patch("time.time_ns", return_value=1557057601_000000000):
+            now_next = utils.current_datetime()
+
+        self.assertEqual(now, datetime.datetime.fromtimestamp(1557057600))
+        self.assertEqual(now.microsecond, 0)
+        self.assertEqual(now_next - now, datetime.timedelta(seconds=1))
+
+    def test_choice_buffer(self):
+        """Test _ChoiceBuffer class."""
+        rng = random.Random(1)
+        buffer = utils._ChoiceBuffer(("a", "b", "c"), rng, refill=4)
+
+        with mock.patch.object(rng, "choices", wraps=rng.choices) as choices:
+            values = [buffer() for _ in range(9)]
+
+        # refilled after every refill draws
+        self.assertEqual(choices.call_count, 3)
+        self.assertTrue(set(values) <= {"a", "b", "c"})
+
+        buffer = utils._ChoiceBuffer(("a", "b", "c"), random.Random(1), 4)
+        self.assertEqual([buffer() for _ in range(9)], values)
+
+    def test_timestamp(self):
+        """Test timestamp function."""
+        now = int(time.time())
+        values = [utils.timestamp(self.fake) for _ in range(100)]
+
+        for value in values:
+            self.assertIsInstance(value, int)
+            self.assertGreaterEqual(value, now - utils.TIMESTAMP_PERIOD)
+            self.assertLessEqual(value, int(time.time()))
+
+        func = utils.get_function("func_timestamp", self.fake)
+        self.assertLessEqual(func(), int(time.time()))
+
+    def test_compile_fields(self):
+        """Test compile_fields function."""
+        fake = utils.faker_localization(None)
+        plan = utils.compile_fields(
+            {"port": "func_rand_int 1 10", "user": ["frank", "robert"]}, fake)
+        self.assertEqual([k for k, _ in plan], ["port", "user"])
+
+        values = {k: fn() for k, fn in plan}
+        self.assertGreaterEqual(values["port"], 1)
+        self.assertLessEqual(values["port"], 10)
+        self.assertIn(values["user"], ["frank", "robert"])
+
+        with self.assertRaises(ValueError):
+            utils.compile_fields({"fake_key": {"fake": "value"}}, fake)
+
+    def test_compile_fields_multiple_locales(self):
+        """Test compile_fields function with a list of locales."""
+        fake = utils.faker_localization(["en_US", "it_IT"])
+        utils.faker_seed(fake, 1)
+        plan = utils.compile_fields(
+            {"user": ["frank", "robert"], "ts": "func_timestamp"}, fake)
+        values = [{k: fn() for k, fn in plan} for _ in range(10)]
+
+        for value in values:
+            self.assertIn(value["user"], ["frank", "robert"])
+            self.assertIsInstance(value["ts"], int)
+
+        utils.faker_seed(fake, 1)
+        plan = utils.compile_fields({"user": ["frank", "robert"]}, fake)
+        self.assertEqual(
+            [plan[0][1]() for _ in range(10)], [i["user"] for i in values])
+
+    def test_compile_template(self):
+        """Test compile_template function."""
+        now = datetime.datetime.now()
+        values = {"ip": "127.0.0.1", "code": 200}
+        template = '{ip} - {:[%d/%b/%Y:%H:%M:%S %z]} "{ip!r}" {code:d} {{}}'
+        render = utils.compile_template(template)
+        self.assertEqual(
+            render(now, values), template.format(now, **values))
+
+        for template in ("{1}", "{a!x}", '{a!"}', "{a!\n}"):
+            with self.assertRaises(ValueError):
+                utils.compile_template(template)
+
+        # manual and automatic numbering can't be mixed, like str.format
+        for template in ("{0:%Y}{}", "{}{0}", "{0.year}{}", "{:%Y}{a:{0}}"):
+            with self.assertRaises(ValueError):
+                template.format(now, a=1)
+            with self.assertRaises(ValueError):
+                utils.compile_template(template)
+
+    def test_compile_log(self):
+        """Test compile_log function."""
+        now = datetime.datetime.now()
+        plan = [("ip", lambda: "127.0.0.1"), ("code", lambda: 200)]
+        template = '{ip} - {:[%d/%b/%Y:%H:%M:%S %z]} "{ip!r}" {code:d} {{}}'
+        render = utils.compile_log(template, plan)
+        self.assertEqual(
+            render(now), template.format(now, ip="127.0.0.1", code=200))
+
+        render = utils.compile_log("{code.real}", plan)
+        self.assertEqual(render(now), "200")
+
+        with self.assertRaises(ValueError):
+            utils.compile_log("{user}", plan)
+
+    def test_generate_many(self):
+        """Test generate_many function."""
+        plan = utils.compile_fields({"user": ["frank", "robert"]}, self.fake)
+        logs = [utils.compile_log("{user}", plan),
+                utils.compile_log("user {user}", plan)]
+        batch = utils.generate_many(logs, 20, utils.faker_rng(self.fake))
+        self.assertEqual(len(batch), 20)
+
+        for log in batch:
+            self.assertTrue(log.endswith("\n"))
+            self.assertIn(log.split()[-1], ["frank", "robert"])
+
+    def test_write_logs(self):
+        """Test write_logs function."""
+        stream = io.StringIO()
+        utils.write_logs(stream, ["a\n", "b\n"])
+        self.assertEqual(stream.getvalue(), "a\nb\n")
+
+    def test_faker_localization(self):
+        """Test faker_localization function."""
+        fake = utils.faker_localization(None)
+        self.assertIs(fake, utils.faker_localization(False))
+        self.assertIsNot(fake, utils.faker_localization("it_IT"))
+        self.assertIs(
+            utils.faker_localization(["en_US", "it_IT"]),
+            utils.faker_localization(["en_US", "it_IT"]))
+
+        weighted = collections.OrderedDict([("en_US", 1), ("it_IT", 2)])
+        fake_weighted = utils.faker_localization(weighted)
+        self.assertIs(fake_weighted, utils.faker_localization(weighted))
+        self.assertIn(fake_weighted.random_element(("a", "b")), ("a", "b"))
+
+        # dispatch table is reused by the next pattern of the same thread
+        table = utils.get_dispatch_table(fake)
+        self.assertIs(
+            utils.get_dispatch_table(utils.faker_localization(None)), table)
+
+        # Faker instances are never shared between threads
+        other = []
+        thread = threading.Thread(
+            target=lambda: other.append(utils.faker_localization(None)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], fake)
+
     def test_get_template_log(self):
         """Test test_get_template_log function."""
-        log = utils.get_template_log(
-            self.pattern["template"][0], self.pattern["fields"])
+        template = utils.compile_template(self.pattern["template"][0])
+        plan = utils.compile_fields(self.pattern["fields"], self.fake)
+        log = utils.get_template_log(template, plan)
         self.assertIsInstance(log, str)
-        log_new = utils.get_template_log(
-            self.pattern["template"][0], self.pattern["fields"])
+        log_new = utils.get_template_log(template, plan)
         self.assertNotEqual(log, log_new)
         self.assertIn("HTTP/1.0", log)
 
-
 if __name__ == '__main__':
     unittest.main(verbosity=2)